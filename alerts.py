@@ -0,0 +1,250 @@
+import collections
+import json
+import os
+import threading
+import time
+import urllib.request
+from datetime import datetime
+
+import numpy as np
+import streamlit as st
+
+import shared_cache
+from market_data import PRICE_CACHE_TTL, get_metric_store, get_stock_data, record_price_refresh
+from universes import UNIVERSE_REGISTRY_PATH, load_universe_registry
+
+# Las rutas relativas (reglas y log) se resuelven contra el directorio de la aplicación
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Reglas de alerta de rendimiento relativo, en un archivo externo como el registro de universos
+ALERT_RULES_PATH = os.environ.get("DASHBOARD_ALERTS", os.path.join(APP_DIR, "alertas.json"))
+ALERT_HISTORY_SIZE = 200
+ALERT_REFRESH_INTERVAL = PRICE_CACHE_TTL  # Segundos entre refrescos en segundo plano
+ALERT_REFRESH_DELAY = 60  # Segundos antes del primer refresco, para no competir con la primera sesión
+
+
+# Función para compilar las reglas en arrays; una regla con "universe" en lugar de "symbol"
+# se expande a todas las empresas del universo frente a su índice
+@st.cache_resource(max_entries=1, show_spinner=False)
+def parse_alert_rules(path, mtime, registry_mtime):
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    registry = load_universe_registry()
+
+    rule_ids = []
+    descriptions = []
+    pairs = []
+    thresholds = []
+    directions = []
+    for rule in raw.get("rules", []):
+        months = int(rule.get("months", 3))
+        if "universe" in rule:
+            universe = registry["indices"][rule["universe"]]
+            benchmark = rule.get("benchmark", universe["symbol"])
+            symbols = universe["stocks"]
+        else:
+            benchmark = rule["benchmark"]
+            symbols = [rule["symbol"]]
+        for symbol in symbols:
+            rule_ids.append(f"{rule.get('id', 'regla')}:{symbol}")
+            descriptions.append(
+                f"{symbol} vs {benchmark} ({months}m) "
+                f"{'<' if rule.get('direction', 'below') == 'below' else '>'} {rule['threshold']:+.2f}%"
+            )
+            pairs.append(((symbol, months), (benchmark, months)))
+            thresholds.append(float(rule["threshold"]))
+            directions.append(-1 if rule.get("direction", "below") == "below" else 1)
+
+    keys = sorted({key for pair in pairs for key in pair})
+    key_position = {key: i for i, key in enumerate(keys)}
+    symbol_idx = np.array([key_position[p[0]] for p in pairs], dtype=np.int64)
+    benchmark_idx = np.array([key_position[p[1]] for p in pairs], dtype=np.int64)
+
+    # Índice inverso clave -> reglas afectadas, para reevaluar solo lo que recibió barras nuevas
+    key_to_rules = {}
+    for rule_pos, (symbol_key, benchmark_key) in enumerate(pairs):
+        key_to_rules.setdefault(symbol_key, []).append(rule_pos)
+        key_to_rules.setdefault(benchmark_key, []).append(rule_pos)
+
+    return {
+        "token": (path, mtime, registry_mtime),
+        "rule_ids": rule_ids,
+        "descriptions": descriptions,
+        "keys": keys,
+        "symbol_idx": symbol_idx,
+        "benchmark_idx": benchmark_idx,
+        "thresholds": np.array(thresholds, dtype=float),
+        "directions": np.array(directions, dtype=np.int8),
+        "key_to_rules": {k: np.array(v, dtype=np.int64) for k, v in key_to_rules.items()},
+        "sinks": [sink for sink in raw.get("sinks", [{"type": "panel"}]) if sink.get("enabled", True)]
+    }
+
+
+# Función para obtener las reglas vigentes (None si no hay archivo de reglas). Los errores de
+# lectura (OSError, ValueError, KeyError) se propagan al llamador
+def load_alert_rules():
+    if not os.path.exists(ALERT_RULES_PATH):
+        return None
+    return parse_alert_rules(
+        ALERT_RULES_PATH,
+        os.path.getmtime(ALERT_RULES_PATH),
+        os.path.getmtime(UNIVERSE_REGISTRY_PATH)
+    )
+
+
+# Estado del motor de alertas por proceso: último exceso de rendimiento por regla e historial
+@st.cache_resource(show_spinner=False)
+def get_alert_engine_state():
+    return {
+        "lock": threading.Lock(),
+        "token": None,
+        "excess": np.array([]),
+        "history": collections.deque(maxlen=ALERT_HISTORY_SIZE),
+        "errors": collections.deque(maxlen=20),
+        "last_eval_ms": None,
+        "last_eval_rules": 0,
+        "last_refresh": None
+    }
+
+
+# Destinos de entrega de alertas; para añadir uno nuevo basta con registrar su función aquí
+def deliver_to_log(alerts, sink):
+    with open(os.path.join(APP_DIR, sink.get("path", "alertas.log")), "a", encoding="utf-8") as f:
+        for alert in alerts:
+            f.write(json.dumps(alert, ensure_ascii=False) + "\n")
+
+
+def deliver_to_webhook(alerts, sink):
+    request = urllib.request.Request(
+        sink["url"],
+        data=json.dumps({"alerts": alerts}, ensure_ascii=False).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=sink.get("timeout", 2)):
+        pass
+
+
+def deliver_to_panel(alerts, sink):
+    get_alert_engine_state()["history"].extendleft(alerts)
+
+
+ALERT_SINKS = {
+    "log": deliver_to_log,
+    "webhook": deliver_to_webhook,
+    "panel": deliver_to_panel
+}
+
+
+# Función para detectar el cruce del umbral en la dirección de cada regla respecto a la
+# evaluación anterior (-1: cae por debajo, 1: sube por encima). NaN nunca cruza
+def find_threshold_crossings(previous, excess, thresholds, directions):
+    return np.where(
+        directions < 0,
+        (previous >= thresholds) & (excess < thresholds),
+        (previous <= thresholds) & (excess > thresholds)
+    )
+
+
+# Función para evaluar las reglas de forma incremental tras los refrescos del almacén de precios
+def evaluate_alerts(rules):
+    state = get_alert_engine_state()
+    store = get_metric_store()
+    with state["lock"]:
+        started = time.perf_counter()
+        with store["lock"]:
+            dirty = store["dirty"]
+            store["dirty"] = set()
+            metrics = [store["metrics"].get(key, (None, np.nan)) for key in rules["keys"]]
+        last_bars = [metric[0] for metric in metrics]
+        performance = np.array([metric[1] for metric in metrics], dtype=float)
+
+        # Si cambiaron las reglas se reevalúan todas; si no, solo las de claves con barras nuevas
+        if state["token"] != rules["token"]:
+            state["token"] = rules["token"]
+            state["excess"] = np.full(len(rules["rule_ids"]), np.nan)
+            affected = np.arange(len(rules["rule_ids"]))
+        else:
+            touched = [rules["key_to_rules"][key] for key in dirty if key in rules["key_to_rules"]]
+            if not touched:
+                return []
+            affected = np.unique(np.concatenate(touched))
+
+        excess = performance[rules["symbol_idx"][affected]] - performance[rules["benchmark_idx"][affected]]
+        crossed = find_threshold_crossings(
+            state["excess"][affected], excess, rules["thresholds"][affected], rules["directions"][affected]
+        )
+        state["excess"][affected] = excess
+        state["last_eval_ms"] = (time.perf_counter() - started) * 1000
+        state["last_eval_rules"] = len(affected)
+
+    # Sesión que provocó cada cruce: la más reciente de las dos series de la regla
+    def crossing_bar(rule_pos):
+        return max(last_bars[rules["symbol_idx"][rule_pos]], last_bars[rules["benchmark_idx"][rule_pos]])
+
+    now = datetime.now().isoformat(timespec="seconds")
+    alerts = [
+        {
+            "time": now,
+            "rule": rules["rule_ids"][rule_pos],
+            "description": rules["descriptions"][rule_pos],
+            "bar": f"{crossing_bar(rule_pos):%Y-%m-%d}",
+            "excess_return": round(float(value), 2)
+        }
+        for rule_pos, value in zip(affected[crossed], excess[crossed])
+    ]
+    if alerts:
+        # Cada réplica detecta el mismo cruce: el panel es local a la réplica, pero el log y el
+        # webhook solo los entrega la primera que reclama la pareja (regla, sesión)
+        claimed = [
+            alert for alert in alerts
+            if shared_cache.claim("alertas_entregadas", f"{alert['rule']}_{alert['bar']}")
+        ]
+        for sink in rules["sinks"]:
+            batch = alerts if sink["type"] == "panel" else claimed
+            if not batch:
+                continue
+            try:
+                ALERT_SINKS[sink["type"]](batch, sink)
+            except Exception as e:
+                state["errors"].appendleft(f"{now} - {sink.get('type')}: {str(e)}")
+    return alerts
+
+
+# Función para pedir al proveedor los símbolos de las reglas (pasa por la caché de precios).
+# Se registra cada serie aunque venga de la caché, porque con caché compartida pudo
+# descargarla otra réplica. 'progress' recibe la fracción completada (opcional)
+def refresh_alert_prices(rules, progress=None):
+    for i, (symbol, months) in enumerate(rules["keys"]):
+        data = get_stock_data(symbol, months)
+        if data is not None:
+            record_price_refresh(symbol, months, data)
+        if progress is not None:
+            progress((i + 1) / len(rules["keys"]))
+    get_alert_engine_state()["last_refresh"] = datetime.now().isoformat(timespec="seconds")
+
+
+# Función del hilo de refresco: cada ALERT_REFRESH_INTERVAL refresca precios y evalúa las reglas,
+# haya o no sesiones abiertas. El primer refresco espera ALERT_REFRESH_DELAY para que la primera
+# ejecución del script no cargue pandas ni yfinance ni lance decenas de consultas al proveedor
+def run_alert_refresh_loop(interval, delay):
+    time.sleep(delay)
+    while True:
+        try:
+            rules = load_alert_rules()
+            if rules is not None:
+                refresh_alert_prices(rules)
+                evaluate_alerts(rules)
+        except Exception as e:
+            get_alert_engine_state()["errors"].appendleft(
+                f"{datetime.now().isoformat(timespec='seconds')} - refresco: {str(e)}"
+            )
+        time.sleep(interval)
+
+
+# Hilo de refresco en segundo plano, uno por proceso
+@st.cache_resource(show_spinner=False)
+def start_alert_refresh_loop(interval=ALERT_REFRESH_INTERVAL, delay=ALERT_REFRESH_DELAY):
+    thread = threading.Thread(target=run_alert_refresh_loop, args=(interval, delay), daemon=True)
+    thread.start()
+    return thread
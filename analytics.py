@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+MAX_FILL_GAP = 5  # Máximo de sesiones consecutivas a rellenar con el último precio
+BASKET_SYMBOL_HEADERS = {"symbol", "símbolo", "simbolo", "ticker"}  # Cabeceras de CSV de una columna
+
+
+# Función para alinear los cierres al calendario de negociación y detectar huecos
+def align_to_calendar(series_data, calendar, max_fill_gap=MAX_FILL_GAP):
+    close_matrix = pd.DataFrame(
+        {name: data['Close'] for name, data in series_data.items() if data is not None}
+    )
+    close_matrix = close_matrix.reindex(calendar)
+
+    missing_before = close_matrix.isna()
+    close_matrix = close_matrix.ffill(limit=max_fill_gap, limit_area='inside')
+    filled = (missing_before & close_matrix.notna()).sum()
+
+    quality = {}
+    for name in close_matrix.columns:
+        column = close_matrix[name]
+        first_valid = column.first_valid_index()
+        issues = []
+        if first_valid is None:
+            issues.append("Sin datos en el calendario de referencia")
+        else:
+            if first_valid > calendar[0]:
+                issues.append(
+                    f"Comienza el {first_valid:%Y-%m-%d} (cotiza desde mitad del período; "
+                    f"se compara con el índice desde esa fecha)"
+                )
+            if filled[name] > 0:
+                issues.append(f"{int(filled[name])} sesiones sin cotización rellenadas")
+            remaining = int(column.loc[first_valid:].isna().sum())
+            if remaining > 0:
+                issues.append(f"{remaining} sesiones sin datos (hueco mayor a {max_fill_gap})")
+        if issues:
+            quality[name] = issues
+
+    return close_matrix.dropna(axis=1, how='all'), quality
+
+
+# Función para calcular base 100 desde el primer cierre válido de cada columna
+def build_base100_frame(close_matrix):
+    if close_matrix is None or close_matrix.empty:
+        return pd.DataFrame()
+    return close_matrix / close_matrix.bfill().iloc[0] * 100
+
+
+# Función para calcular el rendimiento total (%) de cada columna en el período (vacío si la
+# matriz no tiene sesiones o columnas)
+def compute_performance(close_matrix):
+    if close_matrix.empty:
+        return pd.Series(dtype=float, index=close_matrix.columns)
+    return (close_matrix.ffill().iloc[-1] / close_matrix.bfill().iloc[0]) * 100 - 100
+
+
+# Función para calcular el rendimiento (%) del índice en la misma ventana que cada columna:
+# desde el primer cierre válido de la columna hasta el final del período
+def compute_benchmark_performance(close_matrix, benchmark_close):
+    benchmark_close = benchmark_close.reindex(close_matrix.index).ffill().bfill()
+    first_dates = close_matrix.apply(lambda column: column.first_valid_index())
+    start_values = benchmark_close.loc[first_dates.to_numpy()].to_numpy()
+    return pd.Series(
+        benchmark_close.iloc[-1] / start_values * 100 - 100,
+        index=close_matrix.columns
+    )
+
+
+# Función para sintetizar un índice ponderado (base 100) a partir de la matriz de cierres alineada.
+# Sin rebalanceo es un producto matriz-vector; con rebalanceo se encadena un tramo por período
+def synthesize_index(close_matrix, weights, rebalance_freq=None):
+    weights = np.asarray(weights, dtype=float)
+    weights = weights / weights.sum()
+    # Los miembros que empiezan a cotizar tarde se mantienen planos hasta su primer precio
+    prices = close_matrix.ffill().bfill().to_numpy()
+
+    if rebalance_freq is None:
+        values = (prices / prices[0]) @ weights * 100
+    else:
+        period_codes = close_matrix.index.to_period(rebalance_freq).asi8
+        starts = np.flatnonzero(np.r_[True, period_codes[1:] != period_codes[:-1]])
+        ends = np.r_[starts[1:], len(prices)]
+        values = np.empty(len(prices))
+        level = 100.0
+        for start, end in zip(starts, ends):
+            # Se rebalancea con el cierre de la sesión anterior al inicio del período
+            base = max(start - 1, 0)
+            values[start:end] = (prices[start:end] / prices[base]) @ weights * level
+            level = values[end - 1]
+
+    return pd.Series(values, index=close_matrix.index)
+
+
+# Función para sintetizar un índice ponderado por capitalización (base 100). La capitalización
+# actual solo da el número de acciones (capitalización / último cierre); el peso de cada miembro
+# en cada sesión es acciones x precio, así que rebalancear a esos pesos no cambia la serie
+def synthesize_cap_weighted_index(close_matrix, market_caps):
+    prices = close_matrix.ffill().bfill()
+    shares = np.asarray(market_caps, dtype=float) / prices.iloc[-1].to_numpy()
+    values = prices.to_numpy() @ shares
+    return pd.Series(values / values[0] * 100, index=close_matrix.index)
+
+
+# Función para interpretar una cesta escrita como líneas "SÍMBOLO, peso" (peso opcional)
+def parse_basket_text(text):
+    rows = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = [part.strip() for part in line.replace(";", ",").split(",")]
+        weight = float(parts[1]) if len(parts) > 1 and parts[1] else 1.0
+        rows.append({"Símbolo": parts[0].upper(), "Peso": weight})
+    return pd.DataFrame(rows, columns=["Símbolo", "Peso"])
+
+
+# Función para interpretar un CSV (primera columna símbolo, segunda peso opcional). La
+# cabecera es opcional: se detecta porque su segunda columna no es numérica o, con una sola
+# columna, porque su primer valor es un nombre de columna habitual
+def parse_basket_csv(uploaded_file):
+    raw = pd.read_csv(uploaded_file, header=None, dtype=str, skipinitialspace=True)
+    first_symbol = str(raw.iloc[0, 0]).strip().lower()
+    if raw.shape[1] > 1:
+        first_weight = raw.iloc[0, 1]
+        has_header = isinstance(first_weight, str) and pd.isna(pd.to_numeric(first_weight, errors="coerce"))
+    else:
+        has_header = first_symbol in BASKET_SYMBOL_HEADERS
+    if has_header:
+        raw = raw.iloc[1:]
+
+    basket = pd.DataFrame({"Símbolo": raw.iloc[:, 0].astype(str).str.strip().str.upper()})
+    basket["Peso"] = pd.to_numeric(raw.iloc[:, 1], errors="raise").fillna(1.0) if raw.shape[1] > 1 else 1.0
+    return basket.reset_index(drop=True)
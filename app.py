@@ -1,9 +1,54 @@
+import time
+
+SCRIPT_STARTED = time.perf_counter()
+
 import streamlit as st
-import yfinance as yf
-import pandas as pd
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
 import numpy as np
+import functools
+import importlib
+import os
+import sys
+
+import alerts
+import readiness
+import shared_cache
+from market_data import (
+    get_company_name,
+    get_market_cap,
+    get_negative_cache_reason,
+    get_stock_data,
+)
+from universes import UNIVERSE_REGISTRY_PATH, load_universe_registry
+
+
+# Módulo que se importa la primera vez que se usa uno de sus atributos. pandas y yfinance
+# suponen ~0,5 s de arranque en frío y la pantalla inicial no los necesita (yfinance solo se
+# importa dentro de market_data al consultar al proveedor)
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+pd = LazyModule("pandas")
+go = LazyModule("plotly.graph_objects")
+exports = LazyModule("exports")
+analytics = LazyModule("analytics")
+
+# Perfil de arranque opcional (DASHBOARD_PROFILE=1): duración de cada fase de la ejecución
+PROFILE_ENABLED = os.environ.get("DASHBOARD_PROFILE") == "1"
+profile_marks = [("Imports", time.perf_counter())]
+
+
+def profile_mark(label):
+    if PROFILE_ENABLED:
+        profile_marks.append((label, time.perf_counter()))
+
 
 # Configuración de la página
 st.set_page_config(
@@ -12,126 +57,30 @@ st.set_page_config(
     layout="wide"
 )
 
+# Servicios de fondo del proceso (disponibilidad y refresco de alertas). serve.py los arranca
+# antes de la primera sesión; aquí solo se garantizan, antes de cualquier st.stop(), si la app
+# se lanzó directamente con "streamlit run"
+if readiness.HEALTH_PORT:
+    if readiness.start_readiness_server(int(readiness.HEALTH_PORT)) is None:
+        st.sidebar.warning(readiness.get_readiness_state()["server_error"])
+alerts.start_alert_refresh_loop()
+
 # Título principal
 st.title("📈 Dashboard Comparativa Acciones vs Índices")
 st.markdown("---")
 
 # Crear pestañas
-tab1, tab2 = st.tabs(["📊 Índices vs Empresas", "🏢 Comparativa de Sectores"])
+tab1, tab2, tab3 = st.tabs(["📊 Índices vs Empresas", "🏢 Comparativa de Sectores", "💼 Cesta Personalizada"])
 
 # PESTAÑA 1: ÍNDICES VS EMPRESAS (código original)
 with tab1:
-    # Función para obtener el nombre de la empresa
-    @st.cache_data(ttl=86400)  # Cache por 24 horas
-    def get_company_name(symbol):
-        try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            return info.get('longName', info.get('shortName', symbol))
-        except:
-            return symbol
-
-    # Datos de los índices y sus empresas con cobertura completa del mercado
-    indices_data = {
-        "S&P 500": {
-            "symbol": "^GSPC",
-            "stocks": [
-                "MSFT", "AAPL", "NVDA", "AMZN", "META", "GOOGL", "GOOG", "BRK-B", "LLY", "JPM",
-                "AVGO", "TSLA", "V", "XOM", "UNH", "MA", "JNJ", "HD", "PG", "COST"
-            ]
-        },
-        "Nasdaq Composite": {
-            "symbol": "^IXIC",
-            "stocks": [
-                "MSFT", "AAPL", "NVDA", "AMZN", "META", "GOOGL", "GOOG", "AVGO", "TSLA", "COST",
-                "PEP", "ADBE", "NFLX", "AMD", "TMUS", "CSCO", "QCOM", "AMGN", "CMCSA", "ISRG"
-            ]
-        },
-        "Dow Jones": {
-            "symbol": "^DJI",
-            "stocks": [
-                "UNH", "GS", "MSFT", "CAT", "HD", "AMGN", "CRM", "MCD", "V", "JNJ",
-                "TRV", "JPM", "AXP", "HON", "PG", "IBM", "AAPL", "CVX", "BA", "MRK"
-            ]
-        },
-        "Russell 2000": {
-            "symbol": "^RUT",
-            "stocks": [
-                "SMCI", "MSTR", "CVNA", "AFRM", "PLTR", "CELH", "VST", "APP", "ELF", "GTLB",
-                "KRYS", "WFRD", "TOL", "LNW", "FIX", "CHRD", "ENSG", "JBL", "CNM", "FN"
-            ]
-        },
-        "Tecnología (XLK)": {
-            "symbol": "XLK",
-            "stocks": [
-                "MSFT", "AAPL", "NVDA", "AVGO", "CRM", "ORCL", "ADBE", "NOW", "INTU", "IBM",
-                "TXN", "QCOM", "AMD", "MU", "INTC", "ADI", "LRCX", "KLAC", "CDNS", "SNPS"
-            ]
-        },
-        "Financiero (XLF)": {
-            "symbol": "XLF",
-            "stocks": [
-                "BRK-B", "JPM", "V", "MA", "BAC", "WFC", "GS", "MS", "SPGI", "BLK",
-                "C", "AXP", "SCHW", "CB", "MMC", "ICE", "PGR", "AON", "USB", "TFC"
-            ]
-        },
-        "Energético (XLE)": {
-            "symbol": "XLE",
-            "stocks": [
-                "XOM", "CVX", "COP", "EOG", "SLB", "PSX", "MPC", "VLO", "OXY", "BKR",
-                "KMI", "WMB", "OKE", "HES", "DVN", "FANG", "APA", "EQT", "COG", "MRO"
-            ]
-        },
-        "Salud (XLV)": {
-            "symbol": "XLV",
-            "stocks": [
-                "LLY", "UNH", "JNJ", "ABBV", "MRK", "PFE", "TMO", "ABT", "ISRG", "DHR",
-                "BSX", "AMGN", "SYK", "MDT", "GILD", "BDX", "REGN", "VRTX", "ELV", "CI"
-            ]
-        },
-        "Industriales (XLI)": {
-            "symbol": "XLI",
-            "stocks": [
-                "CAT", "RTX", "HON", "UPS", "LMT", "BA", "DE", "GE", "ADP", "MMM",
-                "TDG", "NOC", "EMR", "ETN", "ITW", "PH", "WM", "GD", "RSG", "NSC"
-            ]
-        },
-        "Consumo Discrecional (XLY)": {
-            "symbol": "XLY",
-            "stocks": [
-                "TSLA", "AMZN", "HD", "MCD", "NKE", "LOW", "SBUX", "TJX", "BKNG", "CMG",
-                "ORLY", "AZO", "ROST", "YUM", "GM", "F", "MAR", "HLT", "ABNB", "MGM"
-            ]
-        },
-        "Consumo Básico (XLP)": {
-            "symbol": "XLP",
-            "stocks": [
-                "PG", "COST", "WMT", "PEP", "KO", "PM", "MO", "MDLZ", "CL", "GIS",
-                "KMB", "SYY", "KHC", "CHD", "K", "HSY", "MKC", "CAG", "CPB", "HRL"
-            ]
-        },
-        "Servicios Públicos (XLU)": {
-            "symbol": "XLU",
-            "stocks": [
-                "NEE", "SO", "DUK", "CEG", "SRE", "AEP", "VST", "D", "PCG", "PEG",
-                "EXC", "XEL", "ED", "ETR", "AWK", "ES", "FE", "EIX", "PPL", "CMS"
-            ]
-        },
-        "Bienes Raíces (XLRE)": {
-            "symbol": "XLRE",
-            "stocks": [
-                "PLD", "AMT", "CCI", "EQIX", "PSA", "O", "WELL", "DLR", "EXR", "BXP",
-                "SBAC", "VTR", "ARE", "MAA", "EQR", "INVH", "ESS", "KIM", "REG", "UDR"
-            ]
-        },
-        "Materiales (XLB)": {
-            "symbol": "XLB",
-            "stocks": [
-                "LIN", "SHW", "APD", "FCX", "ECL", "NUE", "NEM", "DOW", "VMC", "MLM",
-                "PPG", "CTVA", "DD", "IFF", "PKG", "IP", "CF", "ALB", "MOS", "FMC"
-            ]
-        }
-    }
+    # Registro de universos (índices, sectores y empresas); sin registro no hay nada que mostrar
+    try:
+        universe_registry = load_universe_registry()
+    except (OSError, ValueError, KeyError) as e:
+        st.error(f"No se pudo cargar el registro de universos ({UNIVERSE_REGISTRY_PATH}): {str(e)}")
+        st.stop()
+    indices_data = universe_registry["indices"]
 
     # Sidebar para controles
     st.sidebar.header("🔧 Configuración")
@@ -160,31 +109,85 @@ with tab1:
     # Botón procesar
     process_button = st.sidebar.button("🚀 Procesar", type="primary")
 
-    # Función para obtener datos de Yahoo Finance
-    @st.cache_data(ttl=3600)  # Cache por 1 hora
-    def get_stock_data(symbol, months):
+    # Invalidar la caché compartida en todas las réplicas
+    if shared_cache.SHARED_CACHE_DIR is not None:
+        if st.sidebar.button("🧹 Invalidar Caché Compartida", key="invalidate_shared_cache"):
+            shared_cache.invalidate()
+            st.sidebar.success("Caché compartida invalidada en todas las réplicas")
+
+    # Función para obtener la capitalización de un miembro; un error del proveedor no se guarda
+    # en caché y se trata como dato ausente (NaN) hasta que se vuelva a cargar la cesta
+    def get_market_cap_or_nan(symbol):
         try:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=months * 30)
-           
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(start=start_date, end=end_date)
-           
-            if data.empty:
-                return None
-               
-            # Calcular rendimiento base 100
-            data['Rendimiento_Base100'] = (data['Close'] / data['Close'].iloc[0]) * 100
-            return data
-        except Exception as e:
-            st.error(f"Error obteniendo datos para {symbol}: {str(e)}")
-            return None
+            return get_market_cap(symbol)
+        except Exception:
+            return np.nan
 
-    # Función para normalizar datos a base 100
-    def normalize_to_base100(data):
-        if data is None or data.empty:
+    # Función para mostrar el informe de calidad de datos
+    def render_data_quality(excluded, quality):
+        if not excluded and not quality:
+            return
+        with st.expander(f"🧪 Calidad de Datos ({len(excluded)} excluidos, {len(quality)} con avisos)"):
+            if excluded:
+                st.markdown("**Símbolos excluidos:**")
+                for symbol, reason in excluded.items():
+                    st.markdown(f"- **{symbol}**: {reason}")
+            if quality:
+                st.markdown("**Símbolos con avisos:**")
+                for symbol, issues in quality.items():
+                    st.markdown(f"- **{symbol}**: {'; '.join(issues)}")
+
+    # Función para mostrar los botones de descarga. Cada archivo se genera solo al pulsar su
+    # botón, a partir de los datos ya cargados, sin guardar copias en la sesión
+    def render_export_controls(datasets, key_prefix, file_suffix):
+        st.markdown("### 💾 Exportar Resultados")
+        export_format = st.selectbox(
+            "Formato de exportación:",
+            options=list(exports.EXPORT_FORMATS.keys()),
+            key=f"{key_prefix}_export_format"
+        )
+        export_cols = st.columns(len(datasets))
+        for col, (label, (file_name, df)) in zip(export_cols, datasets.items()):
+            with col:
+                if df is None or df.empty:
+                    st.markdown(f"*{label}: sin datos*")
+                    continue
+                st.download_button(
+                    f"⬇️ {label}",
+                    data=functools.partial(exports.export_dataframe, df, export_format),
+                    file_name=f"{file_name}_{file_suffix}.{exports.EXPORT_FORMATS[export_format]['ext']}",
+                    mime=exports.EXPORT_FORMATS[export_format]['mime'],
+                    key=f"{key_prefix}_download_{file_name}"
+                )
+
+    # Función para obtener las reglas de alerta vigentes mostrando los errores en la barra lateral
+    def load_alert_rules_or_warn():
+        try:
+            return alerts.load_alert_rules()
+        except (OSError, ValueError, KeyError) as e:
+            st.sidebar.error(f"No se pudieron cargar las reglas de alerta: {str(e)}")
             return None
-        return (data['Close'] / data['Close'].iloc[0]) * 100
+
+    # Función para mostrar el panel de alertas en la barra lateral
+    def render_alert_panel(rules):
+        state = alerts.get_alert_engine_state()
+        with st.sidebar.expander(f"🔔 Alertas ({len(state['history'])})"):
+            st.markdown(f"**Reglas activas**: {len(rules['rule_ids'])}")
+            if state["last_eval_ms"] is not None:
+                st.markdown(
+                    f"**Última evaluación**: {state['last_eval_rules']} reglas en {state['last_eval_ms']:.1f} ms"
+                )
+            if state["last_refresh"] is not None:
+                st.markdown(f"**Último refresco de precios**: {state['last_refresh']}")
+            if st.button("🔄 Actualizar precios de alertas", key="refresh_alert_prices"):
+                progress_bar = st.sidebar.progress(0)
+                alerts.refresh_alert_prices(rules, progress=progress_bar.progress)
+                progress_bar.empty()
+                alerts.evaluate_alerts(rules)
+            for alert in list(state["history"])[:20]:
+                st.markdown(f"- `{alert['time']}` {alert['description']}: **{alert['excess_return']:+.2f}%**")
+            for error in state["errors"]:
+                st.caption(f"⚠️ {error}")
 
     # Inicializar estado de sesión para mantener los datos
     if 'data_loaded' not in st.session_state:
@@ -207,6 +210,7 @@ if process_button:
         stocks_data = {}
         stocks_performance = {}
         company_names = {}
+        excluded_symbols = {}
        
         progress_bar = st.progress(0)
         total_stocks = len(indices_data[selected_index]["stocks"])
@@ -217,14 +221,25 @@ if process_button:
                 stocks_data[stock] = stock_data
                 # Obtener nombre de la empresa
                 company_names[stock] = get_company_name(stock)
-                # Calcular rendimiento final
-                initial_price = stock_data['Close'].iloc[0]
-                final_price = stock_data['Close'].iloc[-1]
-                stocks_performance[stock] = ((final_price / initial_price) * 100) - 100
+            else:
+                excluded_symbols[stock] = get_negative_cache_reason(stock) or "Error al obtener datos"
            
             progress_bar.progress((i + 1) / total_stocks)
        
         progress_bar.empty()
+
+        # Alinear todas las series al calendario de sesiones del índice
+        aligned_close, data_quality = analytics.align_to_calendar(stocks_data, index_data.index)
+        for stock in data_quality:
+            if stock not in aligned_close.columns:
+                excluded_symbols[stock] = "; ".join(data_quality[stock])
+                stocks_data.pop(stock, None)
+        data_quality = {k: v for k, v in data_quality.items() if k in aligned_close.columns}
+        stocks_performance = analytics.compute_performance(aligned_close).to_dict()
+        # Rendimiento del índice en la misma ventana que cada acción (difiere si cotiza desde mitad del período)
+        stocks_index_performance = analytics.compute_benchmark_performance(
+            aligned_close, index_data['Close']
+        ).to_dict()
        
         # Calcular rendimiento del índice
         index_initial = index_data['Close'].iloc[0]
@@ -234,9 +249,13 @@ if process_button:
         # Guardar datos en el estado de sesión
         st.session_state.index_data = index_data
         st.session_state.stocks_data = stocks_data
+        st.session_state.aligned_close = aligned_close
+        st.session_state.excluded_symbols = excluded_symbols
+        st.session_state.data_quality = data_quality
         st.session_state.stocks_performance = stocks_performance
         st.session_state.company_names = company_names
         st.session_state.index_performance = index_performance
+        st.session_state.stocks_index_performance = stocks_index_performance
         st.session_state.selected_index = selected_index
         st.session_state.selected_period_text = selected_period_text
         st.session_state.data_loaded = True
@@ -246,11 +265,15 @@ if st.session_state.data_loaded:
     # Recuperar datos del estado de sesión
     index_data = st.session_state.index_data
     stocks_data = st.session_state.stocks_data
+    aligned_close = st.session_state.aligned_close
     stocks_performance = st.session_state.stocks_performance
     company_names = st.session_state.company_names
     index_performance = st.session_state.index_performance
+    stocks_index_performance = st.session_state.stocks_index_performance
     selected_index = st.session_state.selected_index
     selected_period_text = st.session_state.selected_period_text
+
+    render_data_quality(st.session_state.excluded_symbols, st.session_state.data_quality)
        
     # CONTROLES INTERACTIVOS DEL GRÁFICO
     st.markdown("### 🎛️ Controles del Gráfico")
@@ -277,8 +300,9 @@ if st.session_state.data_loaded:
     # Crear el gráfico
     fig = go.Figure()
     
-    # Preparar datos normalizados del índice
-    index_normalized = normalize_to_base100(index_data)
+    # Preparar datos normalizados del índice y de las acciones alineadas
+    index_normalized = (index_data['Close'] / index_data['Close'].iloc[0]) * 100
+    stocks_base100 = analytics.build_base100_frame(aligned_close)
    
     # Añadir línea del índice solo si está seleccionado
     if show_index:
@@ -302,7 +326,7 @@ if st.session_state.data_loaded:
     for stock, data in stocks_data.items():
         if data is not None:
             stock_performance = stocks_performance.get(stock, 0)
-            is_above_index = stock_performance > index_performance
+            is_above_index = stock_performance > stocks_index_performance[stock]
             
             # Decidir si mostrar esta línea
             should_show = False
@@ -316,7 +340,7 @@ if st.session_state.data_loaded:
                 color_below_idx += 1
             
             if should_show:
-                stock_normalized = normalize_to_base100(data)
+                stock_normalized = stocks_base100[stock]
                 company_name = company_names.get(stock, stock)
                 display_name = f"{stock} - {company_name}"
                 
@@ -325,7 +349,7 @@ if st.session_state.data_loaded:
                 display_name_with_emoji = f"{perf_emoji} {display_name}"
                
                 fig.add_trace(go.Scatter(
-                    x=data.index,
+                    x=stock_normalized.index,
                     y=stock_normalized,
                     mode='lines',
                     name=display_name_with_emoji if len(display_name_with_emoji) <= 55 else f"{perf_emoji} {stock} - {company_name[:35]}...",
@@ -398,7 +422,7 @@ if st.session_state.data_loaded:
     below_index = []
    
     for stock, performance in stocks_performance.items():
-        if performance > index_performance:
+        if performance > stocks_index_performance[stock]:
             above_index.append((stock, performance))
         else:
             below_index.append((stock, performance))
@@ -436,7 +460,7 @@ if st.session_state.data_loaded:
         if above_index:
             for stock, perf in above_index:
                 company_name = company_names.get(stock, stock)
-                diff = perf - index_performance
+                diff = perf - stocks_index_performance[stock]
                 # Truncar nombre de empresa si es muy largo
                 display_company = company_name if len(company_name) <= 30 else f"{company_name[:27]}..."
                 st.markdown(f"**{stock}** - {display_company}")
@@ -451,7 +475,7 @@ if st.session_state.data_loaded:
         if below_index:
             for stock, perf in below_index:
                 company_name = company_names.get(stock, stock)
-                diff = perf - index_performance
+                diff = perf - stocks_index_performance[stock]
                 # Truncar nombre de empresa si es muy largo
                 display_company = company_name if len(company_name) <= 30 else f"{company_name[:27]}..."
                 st.markdown(f"**{stock}** - {display_company}")
@@ -460,6 +484,33 @@ if st.session_state.data_loaded:
         else:
             st.markdown("*No hay empresas por debajo del índice*")
 
+    # EXPORTACIÓN - a partir de los datos ya cargados en la sesión, sin volver a consultar Yahoo
+    st.markdown("---")
+    base100_export = stocks_base100.copy()
+    base100_export.insert(0, f"{selected_index} (Índice)", index_normalized)
+    performance_table = pd.DataFrame(
+        [
+            {
+                "Símbolo": stock,
+                "Empresa": company_names.get(stock, stock),
+                "Índices": ", ".join(universe_registry["symbol_to_indices"].get(stock, [])),
+                "Rendimiento (%)": perf,
+                "Índice (%)": stocks_index_performance[stock],
+                "Diferencia vs Índice (%)": perf - stocks_index_performance[stock],
+                "Posición": "Por encima" if perf > stocks_index_performance[stock] else "Por debajo"
+            }
+            for stock, perf in sorted(stocks_performance.items(), key=lambda x: x[1], reverse=True)
+        ]
+    )
+    render_export_controls(
+        {
+            "Series Base 100": ("base100", base100_export),
+            "Rendimiento vs Índice": ("rendimiento_vs_indice", performance_table)
+        },
+        key_prefix="indices",
+        file_suffix=f"{selected_index}_{selected_period_text}".replace(" ", "_")
+    )
+
 else:
     # Mostrar instrucciones iniciales solo si no hay datos cargados
     if not st.session_state.get('data_loaded', False):
@@ -485,28 +536,19 @@ else:
        
         # Mostrar información de los índices disponibles
         st.markdown("### 📊 Índices Disponibles:")
-        for index_name, index_info in indices_data.items():
-            with st.expander(f"{index_name} ({index_info['symbol']})"):
-                st.write(f"**Top 20 empresas**: {', '.join(index_info['stocks'][:10])}...")
+        for title, text in universe_registry["overview"]:
+            with st.expander(title):
+                st.write(text)
+
+profile_mark("Pestaña Índices")
 
 # PESTAÑA 2: COMPARATIVA DE SECTORES
 with tab2:
     st.markdown("## 🏢 Comparativa General de Sectores")
     st.markdown("Compara el rendimiento de todos los sectores principales del mercado")
     
-    # Extraer solo los sectores (ETFs)
-    sectores_data = {
-        "Tecnología (XLK)": {"symbol": "XLK"},
-        "Financiero (XLF)": {"symbol": "XLF"},
-        "Energético (XLE)": {"symbol": "XLE"},
-        "Salud (XLV)": {"symbol": "XLV"},
-        "Industriales (XLI)": {"symbol": "XLI"},
-        "Consumo Discrecional (XLY)": {"symbol": "XLY"},
-        "Consumo Básico (XLP)": {"symbol": "XLP"},
-        "Servicios Públicos (XLU)": {"symbol": "XLU"},
-        "Bienes Raíces (XLRE)": {"symbol": "XLRE"},
-        "Materiales (XLB)": {"symbol": "XLB"}
-    }
+    # Extraer solo los sectores (ETFs) del registro de universos
+    sectores_data = universe_registry["sectors"]
     
     # Controles SOLO para sectores (en la pestaña actual, NO en sidebar)
     st.markdown("### ⚙️ Configuración")
@@ -547,7 +589,7 @@ with tab2:
         
         with st.spinner("Obteniendo datos de todos los sectores..."):
             sectors_stock_data = {}
-            sectors_performance = {}
+            sectors_excluded = {}
             
             progress_bar = st.progress(0)
             total_sectors = len(sectores_data)
@@ -558,17 +600,31 @@ with tab2:
                 
                 if sector_data is not None:
                     sectors_stock_data[sector_name] = sector_data
-                    # Calcular rendimiento del sector
-                    initial_price = sector_data['Close'].iloc[0]
-                    final_price = sector_data['Close'].iloc[-1]
-                    sectors_performance[sector_name] = ((final_price / initial_price) * 100) - 100
+                else:
+                    sectors_excluded[sector_name] = get_negative_cache_reason(sector_symbol) or "Error al obtener datos"
                 
                 progress_bar.progress((i + 1) / total_sectors)
             
             progress_bar.empty()
+
+        if not sectors_stock_data:
+            st.error(
+                "No se pudieron obtener datos de ningún sector: "
+                + "; ".join(f"{name}: {reason}" for name, reason in sectors_excluded.items())
+            )
+        else:
+            # Alinear los sectores a un calendario común (unión de sesiones) y calcular rendimientos
+            sectors_calendar = pd.DatetimeIndex([])
+            for sector_data in sectors_stock_data.values():
+                sectors_calendar = sectors_calendar.union(sector_data.index)
+            sectors_aligned_close, sectors_data_quality = analytics.align_to_calendar(sectors_stock_data, sectors_calendar)
+            sectors_performance = analytics.compute_performance(sectors_aligned_close).to_dict()
             
             # Guardar datos de sectores en estado de sesión
             st.session_state.sectors_stock_data = sectors_stock_data
+            st.session_state.sectors_aligned_close = sectors_aligned_close
+            st.session_state.sectors_excluded = sectors_excluded
+            st.session_state.sectors_data_quality = sectors_data_quality
             st.session_state.sectors_performance = sectors_performance
             st.session_state.sector_period_text = sector_period_text
             st.session_state.sectors_data_loaded = True
@@ -577,14 +633,17 @@ with tab2:
     if st.session_state.get('sectors_data_loaded', False):
         # Recuperar datos de sectores del estado de sesión
         sectors_stock_data = st.session_state.sectors_stock_data
+        sectors_aligned_close = st.session_state.sectors_aligned_close
         sectors_performance = st.session_state.sectors_performance
         sector_period_text = st.session_state.sector_period_text
+
+        render_data_quality(st.session_state.sectors_excluded, st.session_state.sectors_data_quality)
         
         # Controles para sectores
         st.markdown("### 🎛️ Controles de Visualización de Sectores")
         
         # Crear checkboxes para cada sector en columnas
-        sector_names = list(sectors_stock_data.keys())
+        sector_names = list(sectors_aligned_close.columns)
         num_cols = 5
         cols = st.columns(num_cols)
         
@@ -611,14 +670,15 @@ with tab2:
             '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf'
         ]
         
+        sectors_base100 = analytics.build_base100_frame(sectors_aligned_close)
         color_idx = 0
-        for sector_name, sector_data in sectors_stock_data.items():
+        for sector_name in sectors_base100.columns:
             if sector_visibility.get(sector_name, True):
-                sector_normalized = normalize_to_base100(sector_data)
+                sector_normalized = sectors_base100[sector_name]
                 sector_perf = sectors_performance.get(sector_name, 0)
                 
                 fig_sectors.add_trace(go.Scatter(
-                    x=sector_data.index,
+                    x=sector_normalized.index,
                     y=sector_normalized,
                     mode='lines',
                     name=f"{sector_name.split('(')[0].strip()} ({sector_perf:.1f}%)",
@@ -731,13 +791,23 @@ with tab2:
             })
         
         # Mostrar tabla
-        import pandas as pd
         df_sectors = pd.DataFrame(table_data)
         st.dataframe(df_sectors, use_container_width=True, hide_index=True)
+
+        # Exportar series y tabla resumen de sectores
+        render_export_controls(
+            {
+                "Series Base 100": ("sectores_base100", sectors_base100),
+                "Resumen de Sectores": ("resumen_sectores", df_sectors)
+            },
+            key_prefix="sectors",
+            file_suffix=sector_period_text.replace(" ", "_")
+        )
         
         # Botón para limpiar datos de sectores
         if st.button("🔄 Cargar Nuevos Datos de Sectores", type="secondary", key="reset_sectors"):
-            for key in ['sectors_data_loaded', 'sectors_stock_data', 'sectors_performance', 'sector_period_text']:
+            for key in ['sectors_data_loaded', 'sectors_stock_data', 'sectors_aligned_close', 'sectors_excluded',
+                        'sectors_data_quality', 'sectors_performance', 'sector_period_text']:
                 if key in st.session_state:
                     del st.session_state[key]
             st.rerun()
@@ -779,6 +849,314 @@ with tab2:
         - **Análisis macro**: Comprender la salud económica por sectores
         """)
 
+profile_mark("Pestaña Sectores")
+
+# PESTAÑA 3: CESTA PERSONALIZADA
+with tab3:
+    st.markdown("## 💼 Cesta Personalizada")
+    st.markdown("Define una cartera con pesos propios y compárala con cualquier índice y con un índice sintético de sus miembros")
+
+    st.markdown("### ⚙️ Configuración")
+    col_basket, col_options = st.columns([2, 1])
+
+    with col_basket:
+        basket_text = st.text_area(
+            "Empresas y pesos (una por línea: SÍMBOLO, peso):",
+            value="AAPL, 30\nMSFT, 30\nNVDA, 20\nAMZN, 10\nGOOGL, 10",
+            height=180,
+            key="basket_text"
+        )
+        basket_file = st.file_uploader("O sube un CSV (símbolo, peso):", type=["csv"], key="basket_file")
+
+    with col_options:
+        benchmark_options = {
+            name if f"({info['symbol']})" in name else f"{name} ({info['symbol']})": info['symbol']
+            for name, info in indices_data.items()
+        }
+        benchmark_choice = st.selectbox(
+            "Índice de referencia:",
+            list(benchmark_options.keys()) + ["Otro símbolo..."],
+            key="basket_benchmark_select"
+        )
+        if benchmark_choice == "Otro símbolo...":
+            basket_benchmark = st.text_input("Símbolo del índice:", value="^GSPC", key="basket_benchmark_symbol").strip().upper()
+        else:
+            basket_benchmark = benchmark_options[benchmark_choice]
+
+        basket_period_text = st.selectbox(
+            "Selecciona el Período:",
+            options=list(period_options.keys()),
+            key="basket_period_select"
+        )
+        process_basket_button = st.button("🚀 Procesar", type="primary", key="process_basket")
+
+    if 'basket_data_loaded' not in st.session_state:
+        st.session_state.basket_data_loaded = False
+
+    # Procesamiento de la cesta: solo se consultan al proveedor los símbolos que no estén en caché
+    if process_basket_button:
+        basket = None
+        try:
+            basket = analytics.parse_basket_csv(basket_file) if basket_file is not None else analytics.parse_basket_text(basket_text)
+        except (ValueError, IndexError, pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+            st.error(f"No se pudo interpretar la cesta: {str(e)}")
+        if basket is not None:
+            basket = basket.groupby("Símbolo", as_index=False, sort=False)["Peso"].sum()
+            if basket.empty or (basket["Peso"] < 0).any() or basket["Peso"].sum() <= 0:
+                st.error("La cesta debe tener al menos una empresa y pesos positivos")
+                basket = None
+
+        if basket is not None:
+            with st.spinner("Obteniendo datos de la cesta..."):
+                basket_period = period_options[basket_period_text]
+                benchmark_data = get_stock_data(basket_benchmark, basket_period)
+                if benchmark_data is None:
+                    st.error(f"No se pudieron obtener datos del índice {basket_benchmark}")
+                else:
+                    members_data = {}
+                    basket_excluded = {}
+                    progress_bar = st.progress(0)
+                    for i, symbol in enumerate(basket["Símbolo"]):
+                        member_data = get_stock_data(symbol, basket_period)
+                        if member_data is not None:
+                            members_data[symbol] = member_data
+                        else:
+                            basket_excluded[symbol] = get_negative_cache_reason(symbol) or "Error al obtener datos"
+                        progress_bar.progress((i + 1) / len(basket))
+                    progress_bar.empty()
+
+                    basket_aligned_close, basket_data_quality = analytics.align_to_calendar(members_data, benchmark_data.index)
+                    for symbol in list(basket_data_quality):
+                        if symbol not in basket_aligned_close.columns:
+                            basket_excluded[symbol] = "; ".join(basket_data_quality.pop(symbol))
+
+                    st.session_state.basket_weights = basket[basket["Símbolo"].isin(basket_aligned_close.columns)].reset_index(drop=True)
+                    st.session_state.basket_aligned_close = basket_aligned_close
+                    st.session_state.basket_benchmark_data = benchmark_data
+                    st.session_state.basket_benchmark = basket_benchmark
+                    st.session_state.basket_excluded = basket_excluded
+                    st.session_state.basket_data_quality = basket_data_quality
+                    st.session_state.basket_period_text = basket_period_text
+                    st.session_state.pop('basket_market_caps', None)
+                    st.session_state.basket_data_loaded = bool(len(basket_aligned_close.columns))
+                    if not st.session_state.basket_data_loaded:
+                        st.error(
+                            "Ninguna empresa de la cesta tiene datos en el período: "
+                            + "; ".join(f"{symbol}: {reason}" for symbol, reason in basket_excluded.items())
+                        )
+
+    if st.session_state.get('basket_data_loaded', False):
+        basket_aligned_close = st.session_state.basket_aligned_close
+        benchmark_data = st.session_state.basket_benchmark_data
+        basket_benchmark = st.session_state.basket_benchmark
+        basket_period_text = st.session_state.basket_period_text
+
+        render_data_quality(st.session_state.basket_excluded, st.session_state.basket_data_quality)
+
+        # CONTROLES: los cambios de pesos o de rebalanceo se recalculan sobre la matriz ya cargada
+        st.markdown("### 🎛️ Pesos y Rebalanceo")
+        col_weights, col_controls = st.columns([2, 1])
+
+        with col_weights:
+            edited_weights = st.data_editor(
+                st.session_state.basket_weights,
+                disabled=["Símbolo"],
+                hide_index=True,
+                use_container_width=True,
+                key="basket_weights_editor"
+            )
+
+        with col_controls:
+            synthetic_scheme = st.radio(
+                "Índice sintético de los miembros:",
+                ["Equiponderado", "Por capitalización"],
+                key="basket_synthetic_scheme"
+            )
+            rebalance_options = {"Sin rebalanceo": None, "Mensual": "M", "Trimestral": "Q"}
+            rebalance_text = st.selectbox("Rebalanceo:", list(rebalance_options.keys()), key="basket_rebalance")
+            show_members = st.checkbox("Mostrar empresas individuales", value=False, key="basket_show_members")
+
+        weights = edited_weights.set_index("Símbolo")["Peso"].reindex(basket_aligned_close.columns).fillna(0)
+        if (weights < 0).any() or weights.sum() <= 0:
+            # Solo se omiten los resultados de la cesta; el resto de la página sigue renderizándose
+            st.error("Los pesos deben ser positivos y sumar más de cero")
+        else:
+            rebalance_freq = rebalance_options[rebalance_text]
+            basket_index = analytics.synthesize_index(basket_aligned_close, weights.to_numpy(), rebalance_freq)
+
+            synthetic_weights = np.ones(len(basket_aligned_close.columns))
+            synthetic_index = None
+            if synthetic_scheme == "Por capitalización":
+                # Las capitalizaciones se piden una vez por cesta cargada; cambiar pesos o rebalanceo
+                # no vuelve a consultar al proveedor
+                if 'basket_market_caps' not in st.session_state:
+                    with st.spinner("Obteniendo capitalizaciones..."):
+                        st.session_state.basket_market_caps = pd.Series(
+                            {symbol: get_market_cap_or_nan(symbol) for symbol in basket_aligned_close.columns},
+                            dtype=float
+                        )
+                market_caps = st.session_state.basket_market_caps
+                missing_caps = market_caps[~(market_caps > 0)].index
+                if len(missing_caps):
+                    st.warning(
+                        "Sin capitalización para: " + ", ".join(missing_caps) + ". Se excluyen del índice sintético."
+                    )
+                if (market_caps > 0).any():
+                    synthetic_weights = market_caps.where(market_caps > 0, 0).to_numpy()
+                    synthetic_index = analytics.synthesize_cap_weighted_index(basket_aligned_close, synthetic_weights)
+                    if rebalance_freq is not None:
+                        st.caption(
+                            "El índice por capitalización mantiene el número de acciones de cada miembro: "
+                            "sus pesos siguen a los precios y el rebalanceo no lo modifica."
+                        )
+            if synthetic_index is None:
+                synthetic_index = analytics.synthesize_index(basket_aligned_close, synthetic_weights, rebalance_freq)
+
+            benchmark_base100 = (benchmark_data['Close'] / benchmark_data['Close'].iloc[0]) * 100
+
+            basket_performance = basket_index.iloc[-1] - 100
+            synthetic_performance = synthetic_index.iloc[-1] - 100
+            benchmark_performance = benchmark_base100.iloc[-1] - 100
+
+            # GRÁFICO
+            fig_basket = go.Figure()
+            fig_basket.add_trace(go.Scatter(
+                x=benchmark_base100.index,
+                y=benchmark_base100,
+                mode='lines',
+                name=f'{basket_benchmark} (Índice)',
+                line=dict(color='black', width=4, dash='dash'),
+                hovertemplate=f'<b>{basket_benchmark}</b><br>Fecha: %{{x}}<br>Base 100: %{{y:.2f}}<extra></extra>'
+            ))
+            fig_basket.add_trace(go.Scatter(
+                x=basket_index.index,
+                y=basket_index,
+                mode='lines',
+                name=f'Cesta ({basket_performance:.1f}%)',
+                line=dict(color='#1f77b4', width=4),
+                hovertemplate='<b>Cesta</b><br>Fecha: %{x}<br>Base 100: %{y:.2f}<extra></extra>'
+            ))
+            fig_basket.add_trace(go.Scatter(
+                x=synthetic_index.index,
+                y=synthetic_index,
+                mode='lines',
+                name=f'Sintético {synthetic_scheme.lower()} ({synthetic_performance:.1f}%)',
+                line=dict(color='#ff7f0e', width=3, dash='dot'),
+                hovertemplate=f'<b>Sintético {synthetic_scheme.lower()}</b><br>Fecha: %{{x}}<br>Base 100: %{{y:.2f}}<extra></extra>'
+            ))
+            if show_members:
+                members_base100 = analytics.build_base100_frame(basket_aligned_close)
+                for symbol in members_base100.columns:
+                    fig_basket.add_trace(go.Scatter(
+                        x=members_base100.index,
+                        y=members_base100[symbol],
+                        mode='lines',
+                        name=symbol,
+                        line=dict(width=1),
+                        opacity=0.6,
+                        hovertemplate=f'<b>{symbol}</b><br>Fecha: %{{x}}<br>Base 100: %{{y:.2f}}<extra></extra>'
+                    ))
+
+            fig_basket.update_layout(
+                title=dict(
+                    text=f'Cesta Personalizada vs {basket_benchmark} - Base 100 ({basket_period_text}, {rebalance_text.lower()})',
+                    x=0.5,
+                    xanchor='center'
+                ),
+                xaxis_title='Fecha',
+                yaxis_title='Rendimiento Base 100',
+                hovermode='x unified',
+                height=700,
+                showlegend=True,
+                legend=dict(
+                    orientation="v",
+                    yanchor="top",
+                    y=0.99,
+                    xanchor="left",
+                    x=1.01,
+                    bgcolor="rgba(255,255,255,0.9)",
+                    bordercolor="rgba(0,0,0,0.3)",
+                    borderwidth=1
+                ),
+                margin=dict(l=50, r=250, t=80, b=50)
+            )
+            st.plotly_chart(fig_basket, use_container_width=True)
+
+            # ANÁLISIS DE RENDIMIENTO
+            st.markdown("---")
+            st.markdown("## 📈 Análisis de Rendimiento de la Cesta")
+            col1, col2, col3 = st.columns([1, 1, 1])
+            with col1:
+                st.markdown("### 💼 Cesta")
+                st.markdown(f"Rendimiento: **{basket_performance:.2f}%**")
+                st.markdown(f"**Empresas**: {len(basket_aligned_close.columns)}")
+            with col2:
+                st.markdown(f"### 📊 {basket_benchmark}")
+                st.markdown(f"Rendimiento: **{benchmark_performance:.2f}%**")
+                diff = basket_performance - benchmark_performance
+                st.markdown(f"Diferencia: **{diff:+.2f}%** {'✅' if diff > 0 else '❌'}")
+            with col3:
+                st.markdown(f"### 🧮 Sintético {synthetic_scheme.lower()}")
+                st.markdown(f"Rendimiento: **{synthetic_performance:.2f}%**")
+                diff = basket_performance - synthetic_performance
+                st.markdown(f"Diferencia: **{diff:+.2f}%** {'✅' if diff > 0 else '❌'}")
+
+            basket_series = pd.DataFrame({
+                f"{basket_benchmark} (Índice)": benchmark_base100.reindex(basket_index.index),
+                "Cesta": basket_index,
+                f"Sintético {synthetic_scheme.lower()}": synthetic_index
+            })
+            basket_weights_table = pd.DataFrame({
+                "Símbolo": weights.index,
+                "Peso cesta (%)": (weights / weights.sum() * 100).to_numpy(),
+                "Peso sintético (%)": synthetic_weights / synthetic_weights.sum() * 100,
+                "Rendimiento (%)": analytics.compute_performance(basket_aligned_close).to_numpy()
+            })
+            render_export_controls(
+                {
+                    "Series Base 100": ("cesta_base100", basket_series),
+                    "Pesos y Rendimientos": ("cesta_pesos", basket_weights_table)
+                },
+                key_prefix="basket",
+                file_suffix=basket_period_text.replace(" ", "_")
+            )
+
+        if st.button("🔄 Cargar Nueva Cesta", type="secondary", key="reset_basket"):
+            for key in ['basket_data_loaded', 'basket_weights', 'basket_aligned_close', 'basket_benchmark_data',
+                        'basket_benchmark', 'basket_excluded', 'basket_data_quality', 'basket_period_text',
+                        'basket_market_caps']:
+                if key in st.session_state:
+                    del st.session_state[key]
+            st.rerun()
+
+    else:
+        st.markdown("""
+        ## 🎯 Cesta Personalizada
+
+        ### 📋 Instrucciones:
+        1. **Escribe las empresas** y sus pesos (o sube un CSV)
+        2. **Elige el índice de referencia** y el período
+        3. **Presiona "Procesar"**
+        4. **Ajusta los pesos** o el rebalanceo para ver el efecto al instante
+
+        ### 📊 Funcionalidades:
+        - **Cesta ponderada** frente a cualquier índice
+        - **Índice sintético** equiponderado o por capitalización de los mismos miembros
+        - **Rebalanceo** mensual o trimestral
+        - **Exportación** de series y pesos
+        """)
+
+profile_mark("Pestaña Cesta")
+
+# Evaluar alertas con los refrescos de precios ocurridos en esta ejecución; el hilo de fondo
+# refresca y evalúa cada ALERT_REFRESH_INTERVAL aunque no haya sesiones
+alert_rules = load_alert_rules_or_warn()
+if alert_rules is not None:
+    alerts.evaluate_alerts(alert_rules)
+    render_alert_panel(alert_rules)
+
+profile_mark("Alertas")
+
 # Footer
 st.markdown("---")
 # Botones de reset organizados
@@ -788,8 +1166,9 @@ with col_reset1:
     if st.session_state.get('data_loaded', False):
         if st.button("🔄 Cargar Nuevos Datos (Índices)", type="secondary"):
             # Limpiar el estado para permitir nueva carga
-            for key in ['data_loaded', 'index_data', 'stocks_data', 'stocks_performance', 
-                       'company_names', 'index_performance', 'selected_index', 'selected_period_text']:
+            for key in ['data_loaded', 'index_data', 'stocks_data', 'aligned_close', 'excluded_symbols',
+                       'data_quality', 'stocks_performance', 'company_names', 'index_performance',
+                       'stocks_index_performance', 'selected_index', 'selected_period_text']:
                 if key in st.session_state:
                     del st.session_state[key]
             st.rerun()
@@ -797,18 +1176,25 @@ with col_reset1:
 with col_reset2:
     if st.session_state.get('sectors_data_loaded', False):
         if st.button("🔄 Cargar Nuevos Datos (Sectores)", type="secondary"):
-            for key in ['sectors_data_loaded', 'sectors_stock_data', 'sectors_performance', 'sector_period_text']:
+            for key in ['sectors_data_loaded', 'sectors_stock_data', 'sectors_aligned_close', 'sectors_excluded',
+                        'sectors_data_quality', 'sectors_performance', 'sector_period_text']:
                 if key in st.session_state:
                     del st.session_state[key]
             st.rerun()
 
-
 st.markdown("💡 **Nota**: Los datos se obtienen de Yahoo Finance y pueden tener un retraso de hasta 15 minutos.")
 
-if st.button("🔄 Cargar Nuevos Datos (Sectores)", type="secondary"):
-    for key in ['sectors_data_loaded', 'sectors_stock_data', 'sectors_performance', 'sector_period_text']:
-        if key in st.session_state:
-            del st.session_state[key]
-    st.rerun()
-
-st.markdown("💡 **Nota**: Los datos se obtienen de Yahoo Finance y pueden tener un retraso de hasta 15 minutos.")
+# Mostrar el perfil de esta ejecución
+if PROFILE_ENABLED:
+    profile_mark("Pie de página")
+    with st.sidebar.expander("⏱️ Perfil de Ejecución"):
+        previous = SCRIPT_STARTED
+        for label, mark in profile_marks:
+            st.markdown(f"**{label}**: {(mark - previous) * 1000:.1f} ms")
+            previous = mark
+        st.markdown(f"**Total**: {(previous - SCRIPT_STARTED) * 1000:.1f} ms")
+        loaded = [name for name in ("pandas", "yfinance", "plotly.graph_objects") if name in sys.modules]
+        st.markdown(f"**Módulos pesados cargados**: {', '.join(loaded) or 'ninguno'}")
+        if readiness.HEALTH_PORT:
+            readiness_state = readiness.get_readiness_state()
+            st.markdown(f"**Cachés precalentadas**: {readiness_state['warmed']}/{readiness_state['total']}")
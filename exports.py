@@ -0,0 +1,50 @@
+import importlib.util
+import io
+
+import pandas as pd
+
+# Formatos de exportación disponibles (Arrow, Parquet y Excel dependen de librerías opcionales)
+EXPORT_FORMATS = {"CSV": {"ext": "csv", "mime": "text/csv"}}
+if importlib.util.find_spec("pyarrow") is not None:
+    EXPORT_FORMATS["Arrow"] = {"ext": "arrow", "mime": "application/vnd.apache.arrow.file"}
+    EXPORT_FORMATS["Parquet"] = {"ext": "parquet", "mime": "application/vnd.apache.parquet"}
+if importlib.util.find_spec("openpyxl") is not None:
+    EXPORT_FORMATS["Excel"] = {
+        "ext": "xlsx",
+        "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    }
+
+# Filas por bloque al escribir CSV: to_csv formatea cada bloque por separado en lugar de
+# construir el texto de toda la tabla de una vez
+CSV_CHUNK_ROWS = 50000
+
+
+# Función para serializar un DataFrame al formato elegido. Devuelve un buffer listo para leer;
+# se invoca solo cuando el usuario pulsa el botón de descarga
+def export_dataframe(df, export_format):
+    keep_index = isinstance(df.index, pd.DatetimeIndex)
+    df = df.copy(deep=False)
+    # Excel y algunos lectores no admiten fechas con zona horaria
+    if keep_index and df.index.tz is not None:
+        df.index = df.index.tz_localize(None)
+
+    buffer = io.BytesIO()
+    if export_format in ("Arrow", "Parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(df, preserve_index=keep_index)
+        if export_format == "Arrow":
+            with pa.ipc.new_file(buffer, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            pq.write_table(table, buffer)
+    elif export_format == "Excel":
+        df.to_excel(buffer, index=keep_index, engine="openpyxl")
+    else:
+        text_buffer = io.TextIOWrapper(buffer, encoding="utf-8", newline="")
+        df.to_csv(text_buffer, index=keep_index, chunksize=CSV_CHUNK_ROWS)
+        text_buffer.flush()
+        text_buffer.detach()
+    buffer.seek(0)
+    return buffer
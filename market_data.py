@@ -0,0 +1,130 @@
+import threading
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+import shared_cache
+
+# Parámetros de calidad de datos
+NEGATIVE_CACHE_TTL = 6 * 3600  # Segundos antes de volver a consultar un símbolo descartado
+STALE_MAX_DAYS = 7  # Días naturales sin cotizar para considerar un símbolo obsoleto/deslistado
+PRICE_CACHE_TTL = 3600  # Cache de precios por 1 hora
+
+
+# Caché negativa compartida por todas las sesiones: símbolo -> (momento, motivo)
+@st.cache_resource(show_spinner=False)
+def get_negative_cache():
+    return {}
+
+
+# Función para marcar un símbolo como descartado (en el volumen compartido si existe)
+def mark_negative(symbol, reason):
+    if shared_cache.SHARED_CACHE_DIR is not None:
+        shared_cache.write(shared_cache.entry_path("negativos", symbol, "json"), reason, "json")
+    else:
+        get_negative_cache()[symbol] = (datetime.now(), reason)
+
+
+# Función para consultar si un símbolo está en la caché negativa (y purgarlo si expiró)
+def get_negative_cache_reason(symbol):
+    if shared_cache.SHARED_CACHE_DIR is not None:
+        return shared_cache.read(
+            shared_cache.entry_path("negativos", symbol, "json"), NEGATIVE_CACHE_TTL, "json"
+        )
+    negative_cache = get_negative_cache()
+    entry = negative_cache.get(symbol)
+    if entry is None:
+        return None
+    marked_at, reason = entry
+    if (datetime.now() - marked_at).total_seconds() > NEGATIVE_CACHE_TTL:
+        negative_cache.pop(symbol, None)
+        return None
+    return reason
+
+
+# Tabla de métricas del almacén de precios, compartida por todas las sesiones:
+# (símbolo, meses) -> (última sesión, rendimiento %). 'dirty' guarda las claves con barras nuevas
+@st.cache_resource(show_spinner=False)
+def get_metric_store():
+    return {"metrics": {}, "dirty": set(), "lock": threading.Lock()}
+
+
+# Función para registrar un refresco del almacén de precios
+def record_price_refresh(symbol, months, data):
+    last_bar = data.index[-1]
+    performance = float((data['Close'].iloc[-1] / data['Close'].iloc[0]) * 100 - 100)
+    store = get_metric_store()
+    with store["lock"]:
+        previous = store["metrics"].get((symbol, months))
+        store["metrics"][(symbol, months)] = (last_bar, performance)
+        if previous != (last_bar, performance):
+            store["dirty"].add((symbol, months))
+
+
+# Función para obtener el nombre de la empresa
+@shared_cache.cached("nombres", ttl=86400)  # Cache por 24 horas
+def get_company_name(symbol):
+    import yfinance as yf
+
+    try:
+        ticker = yf.Ticker(symbol)
+        info = ticker.info
+        return info.get('longName', info.get('shortName', symbol))
+    except:
+        return symbol
+
+
+# Función para obtener la capitalización bursátil (para índices ponderados por capitalización).
+# Sin dato devuelve 0.0, que sí se guarda en caché; los errores del proveedor se propagan para
+# que un fallo transitorio no quede en caché 24 horas
+@shared_cache.cached("capitalizaciones", ttl=86400)  # Cache por 24 horas
+def get_market_cap(symbol):
+    import yfinance as yf
+
+    market_cap = yf.Ticker(symbol).info.get('marketCap')
+    return float(market_cap) if market_cap else 0.0
+
+
+# Función para obtener datos de Yahoo Finance. Solo se conserva el cierre, que es lo único que
+# usa el dashboard, para no multiplicar la memoria de la caché por columnas sin uso.
+# Solo se marcan como descartados los símbolos que el proveedor confirma sin datos u obsoletos;
+# los errores de red o de límite de peticiones no se marcan y se reintentan al expirar la caché
+@shared_cache.cached("precios", ttl=PRICE_CACHE_TTL, fmt="arrow")
+def get_stock_data(symbol, months):
+    import yfinance as yf
+    from yfinance.exceptions import YFTickerMissingError
+
+    # No volver a pedir símbolos sin datos u obsoletos hasta que expire la caché negativa
+    if get_negative_cache_reason(symbol) is not None:
+        return None
+    try:
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=months * 30)
+
+        ticker = yf.Ticker(symbol)
+        try:
+            # Con raise_errors los fallos de red se lanzan en lugar de devolver un DataFrame vacío
+            data = ticker.history(start=start_date, end=end_date, raise_errors=True)
+        except YFTickerMissingError:
+            data = None
+
+        if data is None or data.empty:
+            mark_negative(symbol, "Sin datos (posible deslistado)")
+            return None
+
+        # Normalizar a fechas de sesión sin zona horaria para alinear con el calendario
+        if data.index.tz is not None:
+            data.index = data.index.tz_localize(None)
+        data.index = data.index.normalize()
+        data = data.loc[~data.index.duplicated(keep='last'), ['Close']]
+
+        last_bar = data.index[-1]
+        if (end_date - last_bar).days > STALE_MAX_DAYS:
+            mark_negative(symbol, f"Sin cotizaciones desde {last_bar:%Y-%m-%d} (obsoleto o deslistado)")
+            return None
+
+        record_price_refresh(symbol, months, data)
+        return data
+    except Exception as e:
+        st.error(f"Error obteniendo datos para {symbol}: {str(e)}")
+        return None
@@ -0,0 +1,107 @@
+import http.server
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import streamlit as st
+
+import shared_cache
+from market_data import get_negative_cache_reason, get_stock_data
+from universes import load_universe_registry
+
+# Endpoint de disponibilidad para el orquestador (DASHBOARD_HEALTH_PORT)
+HEALTH_PORT = os.environ.get("DASHBOARD_HEALTH_PORT")
+WARMUP_MONTHS = 12  # Solo se precalientan las series de 12 meses de los índices y sectores
+WARMUP_RETRY_INTERVAL = 60  # Segundos entre reintentos de los símbolos que fallaron
+
+
+# Estado del precalentamiento de cachés en este proceso
+@st.cache_resource(show_spinner=False)
+def get_readiness_state():
+    return {
+        "warm": False,
+        "warmed": 0,
+        "failed": [],
+        "delisted": {},
+        "total": 0,
+        "attempts": 0,
+        "error": None,
+        "server_error": None,
+        "started_at": None,
+        "finished_at": None
+    }
+
+
+# Función para precalentar la caché de precios con las series de 12 meses de los índices y
+# sectores del registro. Los símbolos que fallan por un error transitorio se reintentan y,
+# mientras queden, el proceso no se declara disponible; los que el proveedor confirma como
+# deslistados u obsoletos (caché negativa) no se reintentan y se informan en state["delisted"]
+def warm_up_caches(state):
+    state["started_at"] = datetime.now().isoformat(timespec="seconds")
+    pending = None
+    while pending != []:
+        if state["attempts"]:
+            time.sleep(WARMUP_RETRY_INTERVAL)
+        state["attempts"] += 1
+        try:
+            if pending is None:
+                registry = load_universe_registry()
+                pending = list(dict.fromkeys(info["symbol"] for info in registry["indices"].values()))
+                state["total"] = len(pending)
+            failed = []
+            for symbol in pending:
+                if get_stock_data(symbol, WARMUP_MONTHS) is None:
+                    reason = get_negative_cache_reason(symbol)
+                    if reason is not None:
+                        state["delisted"][symbol] = reason
+                        continue
+                    failed.append(symbol)
+                    # Sin caché compartida st.cache_data guarda también el None; se descarta
+                    # para que el reintento vuelva a consultar al proveedor
+                    if shared_cache.SHARED_CACHE_DIR is None:
+                        get_stock_data.clear(symbol, WARMUP_MONTHS)
+            state["warmed"] = state["total"] - len(failed) - len(state["delisted"])
+            state["failed"] = failed
+            state["error"] = None
+            pending = failed
+        except Exception as e:
+            state["error"] = str(e)
+    state["finished_at"] = datetime.now().isoformat(timespec="seconds")
+    state["warm"] = True
+
+
+# Servidor HTTP mínimo, uno por proceso: /healthz (vivo) y /ready (200 solo con cachés calientes
+# y sin símbolos fallidos; los deslistados no cuentan). Arranca también el precalentamiento. Devuelve None si el puerto no
+# está disponible (el motivo queda en state["server_error"])
+@st.cache_resource(show_spinner=False)
+def start_readiness_server(port):
+    state = get_readiness_state()
+    threading.Thread(target=warm_up_caches, args=(state,), daemon=True).start()
+
+    class ReadinessHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/healthz":
+                status = 200
+            elif self.path == "/ready":
+                status = 200 if state["warm"] and not state["failed"] else 503
+            else:
+                status = 404
+            body = json.dumps(state).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = http.server.ThreadingHTTPServer(("0.0.0.0", port), ReadinessHandler)
+    except OSError as e:
+        state["server_error"] = f"No se pudo abrir el puerto de disponibilidad {port}: {str(e)}"
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
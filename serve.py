@@ -0,0 +1,27 @@
+import os
+import sys
+
+import alerts
+import readiness
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+# Lanzador: arranca los servicios de fondo del proceso (endpoint de disponibilidad con
+# precalentamiento y refresco de alertas) antes de la primera sesión y después ejecuta Streamlit
+# en el mismo proceso, de modo que la app reutiliza los mismos hilos y cachés.
+# Uso: python serve.py [opciones de "streamlit run", p. ej. --server.port 8501]
+def main():
+    if readiness.HEALTH_PORT:
+        if readiness.start_readiness_server(int(readiness.HEALTH_PORT)) is None:
+            sys.exit(readiness.get_readiness_state()["server_error"])
+    alerts.start_alert_refresh_loop()
+
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", "run", APP_PATH, *sys.argv[1:]]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
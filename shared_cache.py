@@ -0,0 +1,189 @@
+import contextlib
+import functools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import streamlit as st
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo de archivos entre procesos
+    fcntl = None
+
+# Caché compartida entre réplicas: si se define un directorio (p. ej. un volumen compartido),
+# los datos se guardan ahí y todas las réplicas los reutilizan; si no, se usa st.cache_data
+SHARED_CACHE_DIR = os.environ.get("DASHBOARD_SHARED_CACHE_DIR")
+
+# Tablas Arrow abiertas con memory map en este proceso: ruta -> (mtime, tabla)
+_open_tables = {}
+_open_tables_lock = threading.Lock()
+_open_tables_generation = None
+
+
+# Función para leer la generación vigente; invalidar la caché consiste en incrementarla
+def generation():
+    try:
+        with open(os.path.join(SHARED_CACHE_DIR, "generation"), encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+# Bloqueo entre procesos sobre un archivo (sin efecto en sistemas sin fcntl). Los bloqueos de
+# entradas viven dentro de su generación y se borran con ella
+@contextlib.contextmanager
+def lock(name, directory=None):
+    lock_dir = directory or os.path.join(SHARED_CACHE_DIR, f"gen-{generation()}", "locks")
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, f"{name}.lock"), "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# Función para construir la ruta de una entrada dentro de la generación vigente
+def entry_path(namespace, key, fmt):
+    directory = os.path.join(SHARED_CACHE_DIR, f"gen-{generation()}", namespace)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{urllib.parse.quote(key, safe='')}.{fmt}")
+
+
+# Función para abrir una tabla Arrow con memory map y conservarla abierta en el proceso, de
+# modo que las lecturas repetidas no vuelven a leer ni a copiar el archivo
+def _open_table(path, mtime):
+    global _open_tables_generation
+    import pyarrow as pa
+
+    with _open_tables_lock:
+        current_generation = os.path.basename(os.path.dirname(os.path.dirname(path)))
+        if current_generation != _open_tables_generation:
+            _open_tables.clear()
+            _open_tables_generation = current_generation
+        cached = _open_tables.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+        _open_tables[path] = (mtime, table)
+        return table
+
+
+# Función para convertir la tabla en DataFrame sin copiar: cada columna numérica es una vista
+# de solo lectura sobre el memory map
+def _table_to_frame(table):
+    import pandas as pd
+
+    def column_values(name):
+        column = table.column(name)
+        if column.num_chunks == 1:
+            return column.chunk(0).to_numpy(zero_copy_only=False)
+        return column.to_numpy()
+
+    columns = {name: column_values(name) for name in table.column_names if name != "Date"}
+    index = pd.DatetimeIndex(column_values("Date"), name="Date")
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+# Función para leer una entrada si existe y no ha caducado
+def read(path, ttl, fmt):
+    try:
+        mtime = os.path.getmtime(path)
+        if time.time() - mtime > ttl:
+            return None
+        if fmt == "arrow":
+            return _table_to_frame(_open_table(path, mtime))
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Función para escribir una entrada de forma atómica (archivo temporal + rename). Las tablas
+# se guardan con la fecha como columna "Date" para poder leerlas sin pasar por pandas
+def write(path, value, fmt):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        if fmt == "arrow":
+            import pyarrow as pa
+
+            table = pa.table(
+                {"Date": value.index.to_numpy(), **{name: value[name].to_numpy() for name in value.columns}}
+            )
+            with os.fdopen(fd, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Decorador de caché: en memoria por proceso sin directorio compartido; con él, lectura del
+# volumen compartido y bloqueo por clave para que solo una réplica consulte al proveedor.
+# Los resultados None no se guardan (quien lo necesite debe devolver un valor centinela)
+def cached(namespace, ttl, fmt="json"):
+    def decorator(func):
+        if SHARED_CACHE_DIR is None:
+            # Sin spinner: también se llama desde hilos de fondo, que no tienen sesión donde mostrarlo
+            return st.cache_data(ttl=ttl, show_spinner=False)(func)
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = "_".join(str(arg) for arg in args)
+            path = entry_path(namespace, key, fmt)
+            value = read(path, ttl, fmt)
+            if value is not None:
+                return value
+            with lock(f"{namespace}_{urllib.parse.quote(key, safe='')}"):
+                # Otra réplica pudo haberla escrito mientras esperábamos el bloqueo
+                value = read(path, ttl, fmt)
+                if value is None:
+                    value = func(*args)
+                    if value is not None:
+                        try:
+                            write(path, value, fmt)
+                        except OSError:
+                            # La generación pudo invalidarse durante la escritura
+                            pass
+            return value
+
+        return wrapper
+    return decorator
+
+
+# Función para reclamar una clave una sola vez entre todas las réplicas (creación exclusiva de un
+# archivo marcador). Sin directorio compartido siempre devuelve True
+def claim(namespace, key):
+    if SHARED_CACHE_DIR is None:
+        return True
+    try:
+        os.close(os.open(entry_path(namespace, key, "claim"), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return False
+    return True
+
+
+# Función para invalidar la caché en todas las réplicas: nueva generación y borrado de las
+# anteriores (datos y bloqueos)
+def invalidate():
+    with lock("generation", directory=SHARED_CACHE_DIR):
+        new_generation = generation() + 1
+        generation_path = os.path.join(SHARED_CACHE_DIR, "generation")
+        with open(f"{generation_path}.tmp", "w", encoding="utf-8") as f:
+            f.write(str(new_generation))
+        os.replace(f"{generation_path}.tmp", generation_path)
+    for entry in os.listdir(SHARED_CACHE_DIR):
+        if entry.startswith("gen-") and entry != f"gen-{new_generation}":
+            shutil.rmtree(os.path.join(SHARED_CACHE_DIR, entry), ignore_errors=True)
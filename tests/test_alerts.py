@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import alerts
+import shared_cache
+from market_data import get_metric_store, record_price_refresh
+
+
+def prices(start, end):
+    index = pd.DatetimeIndex(pd.bdate_range("2024-01-01", periods=2), name="Date")
+    return pd.DataFrame({"Close": [start, end]}, index=index)
+
+
+@pytest.fixture
+def rules(tmp_path, monkeypatch):
+    monkeypatch.setattr(alerts, "APP_DIR", str(tmp_path))
+    rules_path = tmp_path / "alertas.json"
+    rules_path.write_text(json.dumps({
+        "sinks": [{"type": "panel"}, {"type": "log", "path": "alertas.log"}],
+        "rules": [
+            {"id": "caida", "symbol": "AAA", "benchmark": "IDX", "months": 3, "threshold": -5, "direction": "below"}
+        ]
+    }))
+    monkeypatch.setattr(alerts, "ALERT_RULES_PATH", str(rules_path))
+    return alerts.load_alert_rules()
+
+
+def test_crossings_follow_rule_direction():
+    previous = np.array([0.0, 0.0, -6.0, 2.0, np.nan])
+    excess = np.array([-6.0, 6.0, -7.0, 6.0, -9.0])
+    thresholds = np.array([-5.0, 5.0, -5.0, 5.0, -5.0])
+    directions = np.array([-1, 1, -1, -1, -1])
+    crossed = alerts.find_threshold_crossings(previous, excess, thresholds, directions)
+    assert crossed.tolist() == [True, True, False, False, False]
+
+
+def test_evaluate_alerts_fires_once_per_crossing_and_logs_to_app_dir(rules, tmp_path):
+    record_price_refresh("AAA", 3, prices(100.0, 100.0))
+    record_price_refresh("IDX", 3, prices(100.0, 100.0))
+    # Primera evaluación: no hay valor anterior con el que comparar
+    assert alerts.evaluate_alerts(rules) == []
+
+    record_price_refresh("AAA", 3, prices(100.0, 90.0))
+    fired = alerts.evaluate_alerts(rules)
+    assert [alert["rule"] for alert in fired] == ["caida:AAA"]
+    assert fired[0]["excess_return"] == -10.0
+
+    # Sin barras nuevas no se reevalúa nada
+    assert alerts.evaluate_alerts(rules) == []
+
+    logged = (tmp_path / "alertas.log").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["rule"] for line in logged] == ["caida:AAA"]
+
+
+def test_replicas_deliver_each_crossing_to_shared_sinks_once(rules, tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_cache, "SHARED_CACHE_DIR", str(tmp_path / "compartida"))
+    record_price_refresh("AAA", 3, prices(100.0, 100.0))
+    record_price_refresh("IDX", 3, prices(100.0, 100.0))
+    alerts.evaluate_alerts(rules)
+    record_price_refresh("AAA", 3, prices(100.0, 90.0))
+    first = alerts.evaluate_alerts(rules)
+
+    # Otra réplica detecta el mismo cruce sobre la misma sesión
+    state = alerts.get_alert_engine_state()
+    state["excess"][:] = 0.0
+    get_metric_store()["dirty"].add(("AAA", 3))
+    second = alerts.evaluate_alerts(rules)
+
+    assert [alert["rule"] for alert in first] == [alert["rule"] for alert in second] == ["caida:AAA"]
+    assert second[0]["bar"] == f"{prices(0, 0).index[-1]:%Y-%m-%d}"
+    assert [alert["rule"] for alert in state["history"]][:2] == ["caida:AAA", "caida:AAA"]
+    logged = (tmp_path / "alertas.log").read_text(encoding="utf-8").splitlines()
+    assert len(logged) == 1
+
+
+def test_refresh_loop_waits_before_first_refresh(monkeypatch):
+    events = []
+
+    class Stop(Exception):
+        pass
+
+    def fake_sleep(seconds):
+        events.append(("sleep", seconds))
+        if len(events) > 2:
+            raise Stop
+
+    monkeypatch.setattr(alerts.time, "sleep", fake_sleep)
+    monkeypatch.setattr(alerts, "load_alert_rules", lambda: events.append("refresh"))
+    with pytest.raises(Stop):
+        alerts.run_alert_refresh_loop(3600, 60)
+    assert events == [("sleep", 60), "refresh", ("sleep", 3600)]
@@ -0,0 +1,108 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analytics
+
+
+@pytest.fixture
+def calendar():
+    return pd.bdate_range("2024-01-01", periods=10)
+
+
+def frame(closes, index):
+    return pd.DataFrame({"Close": closes}, index=index)
+
+
+def test_align_fills_short_gaps_and_reports_them(calendar):
+    stock = frame(np.arange(1.0, 11.0), calendar).drop(calendar[[3, 4]])
+    aligned, quality = analytics.align_to_calendar({"AAA": stock}, calendar)
+    assert aligned["AAA"].isna().sum() == 0
+    assert aligned.loc[calendar[4], "AAA"] == 3.0
+    assert quality["AAA"] == ["2 sesiones sin cotización rellenadas"]
+
+
+def test_align_leaves_long_gaps_unfilled(calendar):
+    stock = frame(np.arange(1.0, 11.0), calendar).drop(calendar[2:6])
+    aligned, quality = analytics.align_to_calendar({"AAA": stock}, calendar, max_fill_gap=2)
+    assert aligned["AAA"].isna().sum() == 2
+    assert "2 sesiones sin datos (hueco mayor a 2)" in quality["AAA"]
+
+
+def test_align_flags_late_listing_without_filling_before_it(calendar):
+    stock = frame([10.0, 11.0, 12.0], calendar[-3:])
+    aligned, quality = analytics.align_to_calendar({"NEW": stock}, calendar)
+    assert aligned["NEW"].first_valid_index() == calendar[-3]
+    assert quality["NEW"][0].startswith(f"Comienza el {calendar[-3]:%Y-%m-%d}")
+
+
+def test_align_drops_symbols_outside_calendar(calendar):
+    outside = frame([1.0, 2.0], pd.bdate_range("2023-01-02", periods=2))
+    aligned, quality = analytics.align_to_calendar({"OLD": outside, "NONE": None}, calendar)
+    assert list(aligned.columns) == []
+    assert quality["OLD"] == ["Sin datos en el calendario de referencia"]
+
+
+def test_base100_and_performance_start_at_first_valid_close(calendar):
+    matrix = pd.DataFrame(
+        {"AAA": np.linspace(10.0, 20.0, 10), "NEW": [np.nan] * 5 + [50.0, 50.0, 50.0, 50.0, 75.0]},
+        index=calendar
+    )
+    base100 = analytics.build_base100_frame(matrix)
+    assert base100["AAA"].iloc[0] == 100.0
+    assert base100["NEW"].iloc[5] == 100.0
+    performance = analytics.compute_performance(matrix)
+    assert performance["AAA"] == pytest.approx(100.0)
+    assert performance["NEW"] == pytest.approx(50.0)
+
+
+def test_benchmark_performance_uses_each_symbol_window(calendar):
+    matrix = pd.DataFrame(
+        {"AAA": np.ones(10), "NEW": [np.nan] * 5 + [1.0] * 5},
+        index=calendar
+    )
+    benchmark = pd.Series(np.linspace(100.0, 190.0, 10), index=calendar)
+    performance = analytics.compute_benchmark_performance(matrix, benchmark)
+    assert performance["AAA"] == pytest.approx(90.0)
+    assert performance["NEW"] == pytest.approx((190.0 / 150.0 - 1) * 100)
+
+
+def test_synthesize_index_chains_rebalanced_periods():
+    index = pd.DatetimeIndex(["2024-01-30", "2024-01-31", "2024-02-01", "2024-02-02"])
+    matrix = pd.DataFrame({"AAA": [10.0, 20.0, 20.0, 40.0], "BBB": [10.0, 10.0, 10.0, 10.0]}, index=index)
+
+    buy_and_hold = analytics.synthesize_index(matrix, [1, 1])
+    assert buy_and_hold.tolist() == pytest.approx([100.0, 150.0, 150.0, 250.0])
+
+    # En febrero se vuelve a 50/50 con el cierre del 31 de enero: 150 * (0.5 * 2 + 0.5 * 1)
+    rebalanced = analytics.synthesize_index(matrix, [1, 1], rebalance_freq="M")
+    assert rebalanced.tolist() == pytest.approx([100.0, 150.0, 150.0, 225.0])
+
+
+def test_cap_weighted_index_holds_shares_from_current_caps():
+    index = pd.bdate_range("2024-01-01", periods=3)
+    matrix = pd.DataFrame({"AAA": [10.0, 15.0, 20.0], "BBB": [50.0, 50.0, 50.0]}, index=index)
+    # Capitalizaciones actuales 200 y 100: 10 acciones de AAA y 2 de BBB
+    synthetic = analytics.synthesize_cap_weighted_index(matrix, [200.0, 100.0])
+    assert synthetic.tolist() == pytest.approx([100.0, 125.0, 150.0])
+
+
+@pytest.mark.parametrize("content", ["AAA,2\nbbb, 1\n", "symbol,weight\nAAA,2\nbbb,1\n"])
+def test_parse_basket_csv_with_and_without_header(content):
+    basket = analytics.parse_basket_csv(io.StringIO(content))
+    assert basket["Símbolo"].tolist() == ["AAA", "BBB"]
+    assert basket["Peso"].tolist() == [2.0, 1.0]
+
+
+def test_parse_basket_csv_single_column_defaults_weights():
+    basket = analytics.parse_basket_csv(io.StringIO("Ticker\nAAA\nBBB\n"))
+    assert basket["Símbolo"].tolist() == ["AAA", "BBB"]
+    assert basket["Peso"].tolist() == [1.0, 1.0]
+
+
+def test_performance_of_empty_matrix_is_empty(calendar):
+    assert analytics.compute_performance(pd.DataFrame(index=pd.DatetimeIndex([]))).empty
+    no_sessions = pd.DataFrame({"AAA": []}, index=pd.DatetimeIndex([]), dtype=float)
+    assert analytics.compute_performance(no_sessions).index.tolist() == ["AAA"]
@@ -0,0 +1,43 @@
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import exports
+
+
+@pytest.fixture
+def base100():
+    index = pd.date_range("2024-01-01", periods=3, tz="America/New_York", name="Date")
+    return pd.DataFrame({"AAPL": [100.0, 101.5, 99.0], "MSFT": [100.0, 98.0, 103.0]}, index=index)
+
+
+def test_csv_keeps_dates_without_timezone(base100):
+    text = exports.export_dataframe(base100, "CSV").read().decode("utf-8")
+    assert text.splitlines()[0] == "Date,AAPL,MSFT"
+    assert text.splitlines()[1] == "2024-01-01,100.0,100.0"
+
+
+def test_csv_in_chunks_matches_single_write(base100, monkeypatch):
+    expected = exports.export_dataframe(base100, "CSV").read()
+    monkeypatch.setattr(exports, "CSV_CHUNK_ROWS", 1)
+    assert exports.export_dataframe(base100, "CSV").read() == expected
+
+
+def test_table_without_date_index_omits_index():
+    table = pd.DataFrame({"Sector": ["Tecnología", "Salud"], "Rendimiento": ["5.00%", "-1.00%"]})
+    text = exports.export_dataframe(table, "CSV").read().decode("utf-8")
+    assert text.splitlines()[0] == "Sector,Rendimiento"
+
+
+def test_arrow_round_trip(base100):
+    buffer = exports.export_dataframe(base100, "Arrow")
+    restored = pa.ipc.open_file(buffer).read_all().to_pandas()
+    pd.testing.assert_frame_equal(restored, base100.tz_localize(None), check_freq=False)
+
+
+def test_parquet_round_trip(base100):
+    restored = pq.read_table(io.BytesIO(exports.export_dataframe(base100, "Parquet").read())).to_pandas()
+    pd.testing.assert_frame_equal(restored, base100.tz_localize(None), check_freq=False)
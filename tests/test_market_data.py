@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+import yfinance as yf
+from yfinance.exceptions import YFPricesMissingError
+
+import market_data
+
+
+class FakeTicker:
+    responses = {}
+    calls = []
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, start=None, end=None, raise_errors=False):
+        FakeTicker.calls.append(self.symbol)
+        response = FakeTicker.responses[self.symbol]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def closes(last_day, periods=5):
+    index = pd.bdate_range(end=last_day, periods=periods, tz="America/New_York")
+    return pd.DataFrame({"Open": 1.0, "Close": range(1, periods + 1)}, index=index)
+
+
+@pytest.fixture(autouse=True)
+def provider(monkeypatch):
+    monkeypatch.setattr(yf, "Ticker", FakeTicker)
+    FakeTicker.responses = {}
+    FakeTicker.calls = []
+    market_data.get_stock_data.clear()
+    market_data.get_negative_cache().clear()
+    yield FakeTicker
+    market_data.get_stock_data.clear()
+    market_data.get_negative_cache().clear()
+
+
+def test_returns_normalized_close_only(provider):
+    provider.responses["AAA"] = closes(datetime.now())
+    data = market_data.get_stock_data("AAA", 1)
+    assert list(data.columns) == ["Close"]
+    assert data.index.tz is None
+
+
+def test_empty_response_is_negative_cached(provider):
+    provider.responses["OLD"] = pd.DataFrame()
+    assert market_data.get_stock_data("OLD", 1) is None
+    assert market_data.get_negative_cache_reason("OLD") == "Sin datos (posible deslistado)"
+
+    # Aunque se vacíe la caché de precios, no se vuelve a consultar al proveedor
+    provider.responses["OLD"] = closes(datetime.now())
+    market_data.get_stock_data.clear()
+    assert market_data.get_stock_data("OLD", 1) is None
+    assert provider.calls == ["OLD"]
+
+
+def test_missing_prices_error_is_negative_cached(provider):
+    provider.responses["GONE"] = YFPricesMissingError("GONE", "")
+    assert market_data.get_stock_data("GONE", 1) is None
+    assert market_data.get_negative_cache_reason("GONE") is not None
+
+
+def test_stale_last_bar_is_negative_cached(provider):
+    last_day = datetime.now() - timedelta(days=market_data.STALE_MAX_DAYS + 10)
+    provider.responses["STALE"] = closes(last_day)
+    last_bar = provider.responses["STALE"].index[-1]
+    assert market_data.get_stock_data("STALE", 1) is None
+    assert market_data.get_negative_cache_reason("STALE").startswith(f"Sin cotizaciones desde {last_bar:%Y-%m-%d}")
+
+
+def test_network_error_is_not_negative_cached(provider):
+    provider.responses["AAA"] = ConnectionError("Could not resolve host")
+    assert market_data.get_stock_data("AAA", 1) is None
+    assert market_data.get_negative_cache_reason("AAA") is None
+
+    provider.responses["AAA"] = closes(datetime.now())
+    market_data.get_stock_data.clear()
+    assert market_data.get_stock_data("AAA", 1) is not None
@@ -0,0 +1,90 @@
+import json
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+import readiness
+
+
+def prices():
+    return pd.DataFrame({"Close": [1.0, 2.0]}, index=pd.bdate_range("2024-01-01", periods=2))
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    responses = {}
+    negative = {}
+    calls = []
+
+    def fake_get_stock_data(symbol, months):
+        calls.append(symbol)
+        response = responses[symbol]
+        return response.pop(0) if isinstance(response, list) else response
+
+    fake_get_stock_data.clear = lambda symbol, months: calls.append(f"clear:{symbol}")
+    registry = {"indices": {"S&P 500": {"symbol": "SPY"}, "Energía": {"symbol": "XLE"}, "Viejo": {"symbol": "OLD"}}}
+    monkeypatch.setattr(readiness, "WARMUP_RETRY_INTERVAL", 0)
+    monkeypatch.setattr(readiness, "load_universe_registry", lambda: registry)
+    monkeypatch.setattr(readiness, "get_stock_data", fake_get_stock_data)
+    monkeypatch.setattr(readiness, "get_negative_cache_reason", negative.get)
+    return responses, negative, calls
+
+
+def new_state():
+    return {"warm": False, "warmed": 0, "failed": [], "delisted": {}, "total": 0, "attempts": 0, "error": None}
+
+
+def test_transient_failures_are_retried_until_warm(provider):
+    responses, _, calls = provider
+    responses.update({"SPY": prices(), "XLE": [None, prices()], "OLD": prices()})
+    state = new_state()
+    readiness.warm_up_caches(state)
+    assert state["warm"] and state["failed"] == [] and state["delisted"] == {}
+    assert state["attempts"] == 2 and state["warmed"] == 3
+    # El None transitorio se descarta de la caché para que el reintento consulte al proveedor
+    assert calls == ["SPY", "XLE", "clear:XLE", "OLD", "XLE"]
+
+
+def test_delisted_symbols_do_not_block_readiness(provider):
+    responses, negative, calls = provider
+    responses.update({"SPY": prices(), "XLE": prices(), "OLD": None})
+    negative["OLD"] = "Sin datos (posible deslistado)"
+    state = new_state()
+    readiness.warm_up_caches(state)
+    assert state["warm"] and state["failed"] == []
+    assert state["delisted"] == {"OLD": "Sin datos (posible deslistado)"}
+    assert state["attempts"] == 1 and state["warmed"] == 2
+    assert calls.count("OLD") == 1
+
+
+def get_status(port, path):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}") as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_ready_status_codes(monkeypatch):
+    monkeypatch.setattr(readiness, "warm_up_caches", lambda state: None)
+    server = readiness.start_readiness_server(0)
+    port = server.server_address[1]
+    state = readiness.get_readiness_state()
+    saved = dict(state)
+    try:
+        assert get_status(port, "/healthz")[0] == 200
+        assert get_status(port, "/otro")[0] == 404
+        assert get_status(port, "/ready")[0] == 503
+
+        state.update(warm=True, failed=["XLE"])
+        assert get_status(port, "/ready")[0] == 503
+
+        state.update(failed=[], delisted={"OLD": "Sin datos (posible deslistado)"})
+        status, body = get_status(port, "/ready")
+        assert status == 200 and body["delisted"] == {"OLD": "Sin datos (posible deslistado)"}
+    finally:
+        state.clear()
+        state.update(saved)
+        server.shutdown()
@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_cache, "SHARED_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def prices():
+    index = pd.DatetimeIndex(pd.bdate_range("2024-01-01", periods=5), name="Date")
+    return pd.DataFrame({"Close": np.arange(10.0, 15.0)}, index=index)
+
+
+def test_json_round_trip_and_ttl(cache_dir):
+    path = shared_cache.entry_path("nombres", "AAPL", "json")
+    shared_cache.write(path, "Apple Inc.", "json")
+    assert shared_cache.read(path, 60, "json") == "Apple Inc."
+    os.utime(path, (0, 0))
+    assert shared_cache.read(path, 60, "json") is None
+
+
+def test_arrow_read_is_a_view_on_the_memory_map(cache_dir, prices):
+    path = shared_cache.entry_path("precios", "AAPL_12", "arrow")
+    shared_cache.write(path, prices, "arrow")
+    restored = shared_cache.read(path, 60, "arrow")
+    pd.testing.assert_frame_equal(restored, prices, check_freq=False, check_index_type=False)
+
+    table = shared_cache._open_tables[path][1]
+    buffer_address = table.column("Close").chunk(0).buffers()[1].address
+    assert restored["Close"].to_numpy().__array_interface__["data"][0] == buffer_address
+
+
+def test_cached_calls_provider_once_across_replicas(cache_dir):
+    calls = []
+
+    def fetch(symbol):
+        calls.append(symbol)
+        return f"{symbol} Inc."
+
+    replica_a = shared_cache.cached("nombres", ttl=60)(fetch)
+    replica_b = shared_cache.cached("nombres", ttl=60)(fetch)
+    assert replica_a("MSFT") == "MSFT Inc."
+    assert replica_b("MSFT") == "MSFT Inc."
+    assert calls == ["MSFT"]
+
+
+def test_cached_does_not_store_none(cache_dir):
+    calls = []
+
+    @shared_cache.cached("nombres", ttl=60)
+    def fetch(symbol):
+        calls.append(symbol)
+        return None
+
+    fetch("XXX")
+    fetch("XXX")
+    assert calls == ["XXX", "XXX"]
+
+
+def test_invalidate_starts_new_generation_and_removes_old_entries_and_locks(cache_dir):
+    calls = []
+
+    @shared_cache.cached("nombres", ttl=60)
+    def fetch(symbol):
+        calls.append(symbol)
+        return symbol.lower()
+
+    fetch("AAPL")
+    assert os.listdir(cache_dir / "gen-0" / "locks")
+
+    shared_cache.invalidate()
+    assert shared_cache.generation() == 1
+    assert not (cache_dir / "gen-0").exists()
+
+    fetch("AAPL")
+    assert calls == ["AAPL", "AAPL"]
@@ -0,0 +1,51 @@
+import json
+import os
+
+import streamlit as st
+
+# Registro de universos (índices, sectores y empresas) en un archivo versionado externo
+UNIVERSE_REGISTRY_PATH = os.environ.get(
+    "DASHBOARD_UNIVERSES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "universos.json")
+)
+
+
+# Función para parsear el registro una sola vez por proceso; la fecha de modificación
+# forma parte de la clave, así que un cambio en el archivo provoca una recarga
+@st.cache_resource(max_entries=1, show_spinner=False)
+def parse_universe_registry(path, mtime):
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+
+    indices = {}
+    sectors = {}
+    symbol_to_indices = {}
+    sector_members = {}
+    for entry in raw["indices"]:
+        indices[entry["name"]] = {"symbol": entry["symbol"], "stocks": entry["stocks"]}
+        if entry.get("sector", False):
+            sectors[entry["name"]] = {"symbol": entry["symbol"]}
+            sector_members[entry["symbol"]] = entry["stocks"]
+        for stock in entry["stocks"]:
+            symbol_to_indices.setdefault(stock, []).append(entry["name"])
+
+    # Textos de la pantalla de bienvenida, calculados una vez por versión del registro
+    overview = [
+        (f"{name} ({info['symbol']})", f"**Top 20 empresas**: {', '.join(info['stocks'][:10])}...")
+        for name, info in indices.items()
+    ]
+
+    return {
+        "version": raw.get("version"),
+        "overview": overview,
+        "indices": indices,
+        "sectors": sectors,
+        "symbol_to_indices": symbol_to_indices,
+        "sector_members": sector_members
+    }
+
+
+# Función para obtener el registro vigente (solo cuesta un stat por llamada). Los errores de
+# lectura (OSError, ValueError, KeyError) se propagan para que cada llamador decida cómo mostrarlos
+def load_universe_registry():
+    return parse_universe_registry(UNIVERSE_REGISTRY_PATH, os.path.getmtime(UNIVERSE_REGISTRY_PATH))